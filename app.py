@@ -4,7 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import math
-import time
+import os
 from plotly.subplots import make_subplots
 
 # -----------------------------------------------------------------------------
@@ -24,18 +24,62 @@ def local_css(file_name):
 
 local_css("style.css")
 
-@st.cache_data
+EMDAT_CSV = "data/public_emdat_1970_2020.csv"
+EMDAT_PARQUET = "data/public_emdat_1970_2020.parquet"
+
+# 앱에서 실제로 사용하는 EM-DAT 컬럼만 읽음
+EMDAT_COLUMNS = [
+    'Start Year', 'Disaster Group', 'Disaster Type', 'Region', 'ISO', 'Country',
+    'Total Deaths', 'Total Affected', 'Total Damage (\'000 US$)',
+]
+
+# groupby/isin 키로 반복 사용되어 category로 보관하는 문자열 컬럼
+EMDAT_CATEGORY_COLUMNS = ['Disaster Type', 'Disaster Group', 'Region', 'ISO', 'Country']
+
+# 원본 프레임은 읽기 전용으로만 사용하므로 cache_resource로 공유 (cache hit 시 복사 없음)
+@st.cache_resource
 def load_data():
-    df = pd.read_csv("data/public_emdat_1970_2020.csv")
-    df_korea = pd.read_csv("data/df_korea.csv")
+    # CSV가 Parquet보다 새로우면(데이터 갱신) Parquet을 무시하고 CSV에서 다시 만듦
+    from_parquet = os.path.exists(EMDAT_PARQUET) and (
+        not os.path.exists(EMDAT_CSV)
+        or os.path.getmtime(EMDAT_PARQUET) >= os.path.getmtime(EMDAT_CSV)
+    )
+    if from_parquet:
+        df = pd.read_parquet(EMDAT_PARQUET, columns=EMDAT_COLUMNS)
+    else:
+        df = pd.read_csv(
+            EMDAT_CSV,
+            usecols=EMDAT_COLUMNS,
+            dtype={col: 'category' for col in EMDAT_CATEGORY_COLUMNS},
+            engine='pyarrow',
+        )
+    df_korea = pd.read_csv("data/df_korea.csv", engine='pyarrow')
     
     df = df[df['Start Year'].notna()]
-    df['Start Year'] = df['Start Year'].astype(int)
+    df['Start Year'] = df['Start Year'].astype('int16')
     
+    # 결측을 0으로 채운 뒤 가능한 가장 작은 unsigned 정수형으로 축소 (소수가 있으면 float 유지)
     cols_to_fix = ['Total Deaths', 'Total Affected', 'Total Damage (\'000 US$)']
     for col in cols_to_fix:
         if col in df.columns:
-            df[col] = df[col].fillna(0)
+            df[col] = pd.to_numeric(df[col].fillna(0), downcast='unsigned')
+
+    # Parquet 파일이 category 정보를 잃었을 경우 대비 (CSV는 읽을 때 이미 변환됨)
+    for col in EMDAT_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    # 정리된 프레임을 Parquet으로 저장해 다음 콜드 스타트부터는 CSV 파싱/변환을 건너뜀
+    if not from_parquet:
+        try:
+            df.to_parquet(EMDAT_PARQUET, index=False)
+        except OSError:
+            pass  # 쓰기 불가능한 배포 환경에서는 매번 CSV로 동작
+
+    iso_map = df[['Region', 'ISO', 'Country']].drop_duplicates().reset_index(drop=True)
+
+    # 연도 구간 필터를 searchsorted 슬라이스로 처리할 수 있도록 연도 순으로 정렬
+    df = df.sort_values('Start Year', kind='stable').reset_index(drop=True)
     
     if 'Start Year' in df_korea.columns:
         df_korea = df_korea.rename(columns={'Start Year': 'Year'})
@@ -44,14 +88,102 @@ def load_data():
     
     df_korea['Total_Deaths'] = df_korea['Total_Deaths'].fillna(0)
     
-    return df, df_korea
+    return df, df_korea, iso_map
 
 try:
-    df_raw, df_korea_raw = load_data()
+    df_raw, df_korea_raw, df_iso_mapping = load_data()
 except FileNotFoundError:
     st.error("데이터 파일을 찾을 수 없습니다.")
     st.stop()
 
+def year_slice(df, year_lo, year_hi):
+    # df는 'Start Year' 기준으로 정렬되어 있어야 함 (df_raw 및 그 부분집합)
+    years = df["Start Year"]
+    lo = years.searchsorted(year_lo, side="left")
+    hi = years.searchsorted(year_hi, side="right")
+    return df.iloc[lo:hi]
+
+@st.cache_data(show_spinner=False)
+def build_cube(_df):
+    # (연도, 대륙, 재해 유형) 단위 사전 집계 — 발생 건수/사망자/피해 인구는 모두 합산 가능
+    return (
+        _df.groupby(["Start Year", "Region", "Disaster Type"], observed=True, sort=False)
+        .agg(
+            Occurrences=("Disaster Type", "size"),
+            Deaths=("Total Deaths", "sum"),
+            Affected=("Total Affected", "sum"),
+        )
+        .reset_index()
+        # year_slice(searchsorted)가 연도순 정렬을 전제로 하므로 입력 순서에 기대지 않고 여기서 정렬
+        .sort_values("Start Year", kind="stable", ignore_index=True)
+    )
+
+df_cube = build_cube(df_raw)
+
+# 마지막 연도는 집계가 불완전하므로 그래프 기간에서 제외 (df_raw는 연도순 정렬)
+LAST_FULL_YEAR = int(df_raw["Start Year"].iloc[-1]) - 1
+
+def region_mask(df, region):
+    # region="Global"이면 전체 행을 선택하는 boolean 배열
+    if region == "Global":
+        return np.ones(len(df), dtype=bool)
+    return (df["Region"] == region).to_numpy()
+
+def type_mask(df, types):
+    # 'Disaster Type'은 category이므로 카테고리별 선택 여부 표를 만들고 코드로 인덱싱
+    # (표 끝에 False 한 칸을 더 둬서 결측 코드 -1도 False가 되도록 함)
+    cat = df["Disaster Type"].cat
+    selected = np.zeros(len(cat.categories) + 1, dtype=bool)
+    codes = cat.categories.get_indexer(list(types))
+    selected[codes[codes >= 0]] = True
+    return selected[cat.codes.to_numpy()]
+
+@st.cache_data(show_spinner=False)
+def region_list(_df):
+    # 대륙 선택 라디오 옵션 ("Global" + 데이터에 있는 대륙, 이름순)
+    # _df는 캐시 키에서 제외되므로 항상 df_raw로만 호출
+    return ["Global"] + sorted(_df["Region"].dropna().unique().tolist())
+
+@st.cache_data(show_spinner=False)
+def type_list(_df):
+    # 데이터에 실제로 있는 재해 유형 (이름순)
+    # _df는 캐시 키에서 제외되므로 항상 df_raw로만 호출
+    return sorted(_df["Disaster Type"].dropna().unique().tolist())
+
+@st.cache_data(show_spinner=False)
+def top_n_types(_df, region, n):
+    # 발생 건수 기준 Top N 재해 유형 (region="Global"이면 전체)
+    d = _df if region == "Global" else _df[_df["Region"] == region]
+    # category의 value_counts는 관측되지 않은 유형도 0건으로 포함하므로 제외
+    counts = d["Disaster Type"].value_counts()
+    return tuple(counts[counts > 0].nlargest(n).index.tolist())
+
+@st.cache_data(show_spinner=False)
+def top_n_types_by_deaths(_cube, region, n):
+    # 사망자 합계 기준 Top N 재해 유형 (region="Global"이면 전체)
+    d = _cube[region_mask(_cube, region)]
+    return tuple(
+        d.groupby("Disaster Type", observed=True, sort=False)["Deaths"]
+        .sum()
+        .sort_values(ascending=False)
+        .head(n)
+        .index
+        .tolist()
+    )
+
+# 섹션 3/4는 유형 체크만 바뀌는 경우가 많으므로 대륙별 (연도, 유형) 집계를 한 번 만들어 두고
+# 선택 유형은 이 작은 표에서 마스크로만 고름 (그래프 입력으로 읽기만 하므로 cache_resource)
+@st.cache_resource(show_spinner=False)
+def region_type_yearly(_cube, region):
+    return (
+        _cube[region_mask(_cube, region)]
+        .groupby(["Start Year", "Disaster Type"], observed=True, sort=False)[["Occurrences", "Deaths"]]
+        .sum()
+        .reset_index()
+        # 섹션 3/4의 연도 범위 필터(year_slice)가 연도순 정렬을 전제로 하므로 명시적으로 정렬
+        .sort_values("Start Year", kind="stable", ignore_index=True)
+    )
+
 # -----------------------------------------------------------------------------
 # 2. 메인 헤더
 # -----------------------------------------------------------------------------
@@ -80,29 +212,31 @@ st.markdown("##### 대륙별 재해 발생과 피해 규모 한눈에 보기")
 
 DEFAULT_METRIC = "발생 건수"
 
-top_5_disasters = df_raw["Disaster Type"].value_counts().nlargest(5).index.tolist()
+top_5_disasters = top_n_types(df_raw, "Global", 5)
 
-palette = (
-    px.colors.qualitative.Plotly +
-    px.colors.qualitative.Set1 +
-    px.colors.qualitative.Set2 +
-    px.colors.qualitative.Safe
-)
+# 유형 이름 기준 고정 색상 — 세션과 무관한 값이므로 세션마다 만들지 않고 캐시
+@st.cache_data(show_spinner=False)
+def build_color_map(_df):
+    palette = (
+        px.colors.qualitative.Plotly +
+        px.colors.qualitative.Set1 +
+        px.colors.qualitative.Set2 +
+        px.colors.qualitative.Safe
+    )
 
-all_types = sorted(df_raw["Disaster Type"].dropna().unique().tolist())
-
-manual_colors = {
-    "Flood": "#4c78a8",
-    "Storm": "#f58518",
-    "Drought": "#e45756",
-    "Wildfire": "#ffbf00",
-    "Earthquake": "#72b7b2",
-    "Landslide": "#54a24b",
-    "Extreme temperature": "#b279a2",
-    "Epidemic": "#ff9da6",
-}
+    all_types = type_list(_df)
+
+    manual_colors = {
+        "Flood": "#4c78a8",
+        "Storm": "#f58518",
+        "Drought": "#e45756",
+        "Wildfire": "#ffbf00",
+        "Earthquake": "#72b7b2",
+        "Landslide": "#54a24b",
+        "Extreme temperature": "#b279a2",
+        "Epidemic": "#ff9da6",
+    }
 
-if "DISASTER_COLOR_MAP" not in st.session_state:
     cmap = {}
     used_colors = set(manual_colors.values())
     palette_index = 0
@@ -117,175 +251,177 @@ if "DISASTER_COLOR_MAP" not in st.session_state:
             used_colors.add(cmap[t])
             palette_index += 1
 
-    st.session_state["DISASTER_COLOR_MAP"] = cmap
+    return cmap
 
-DISASTER_COLOR_MAP = st.session_state["DISASTER_COLOR_MAP"]
-
-for t in top_5_disasters:
-    k = f"globe_type_{t}"
-    if k not in st.session_state:
-        st.session_state[k] = True
+DISASTER_COLOR_MAP = build_color_map(df_raw)
 
 if "globe_metric" not in st.session_state:
     st.session_state["globe_metric"] = DEFAULT_METRIC
 
 if "globe_types" not in st.session_state:
-    st.session_state["globe_types"] = top_5_disasters
+    st.session_state["globe_types"] = list(top_5_disasters)
 
-if "globe_render_key" not in st.session_state:
-    st.session_state["globe_render_key"] = 0
+# 지구본 연도 슬라이더 범위 (마지막 연도는 집계가 불완전하므로 제외)
+GLOBE_MIN_YEAR = int(df_cube["Start Year"].iloc[0])
+GLOBE_MAX_YEAR = LAST_FULL_YEAR
 
-if "globe_reset" not in st.session_state:
-    st.session_state["globe_reset"] = False
+if "globe_year" not in st.session_state:
+    st.session_state["globe_year"] = GLOBE_MAX_YEAR
 
-if st.session_state["globe_reset"]:
-    for t in top_5_disasters:
-        st.session_state[f"globe_type_{t}"] = True    
+if "globe_view_rev" not in st.session_state:
+    st.session_state["globe_view_rev"] = 0
 
-    st.session_state["globe_types"] = top_5_disasters
-    st.session_state["globe_metric"] = DEFAULT_METRIC
+if "globe_reset" not in st.session_state:
     st.session_state["globe_reset"] = False
 
-col_metric, col_reset = st.columns([8, 2])
+@st.cache_data(show_spinner=False)
+def build_region_year(_cube, selected_types, value_col):
+    # 연도 범위는 선택 유형과 무관하게 전체 큐브 기준 (슬라이더와 동일) — 슬라이스 후 유형 마스크 한 번만 적용
+    cube = year_slice(_cube, GLOBE_MIN_YEAR, GLOBE_MAX_YEAR)
+    cube = cube[type_mask(cube, selected_types)]
 
-with col_metric:
-    metric_choice = st.radio(
-        "시각화 지표 선택:",
-        ("발생 건수", "사망자 수", "피해 인구"),
-        horizontal=True,
-        key="globe_metric"
+    return (
+        cube.groupby(["Start Year", "Region"], observed=True, sort=False)[value_col]
+        .sum()
+        .reset_index(name="Value")
     )
 
-with col_reset:
-    st.markdown("<div style='height:32px'></div>", unsafe_allow_html=True)
-    if st.button("↩ 지구본 초기화", key="btn_reset_globe"):
-        st.session_state["globe_reset"] = True
-        st.session_state["globe_render_key"] += 1
-        st.rerun()
+# 지표별 (집계 컬럼, 색상 스케일)
+GLOBE_METRICS = {
+    "발생 건수": ("Occurrences", "Oranges"),
+    "사망자 수": ("Deaths", "Reds"),
+    "피해 인구": ("Affected", "YlOrBr"),
+}
 
-st.caption("재해 유형 선택 (Top 5)")
+# 지구본의 배치/색 범위/스타일은 (유형, 지표) 조합에만 의존하므로 한 번 만들어 두고 연도별로 복사해 사용
+@st.cache_resource(show_spinner=False, max_entries=32)
+def build_globe_base(_cube, _iso_map, selected_types, metric_choice, uirevision):
+    value_col, color_scale = GLOBE_METRICS[metric_choice]
+    region_year = build_region_year(_cube, tuple(sorted(selected_types)), value_col)
+
+    # 색 범위는 전체 연도 기준으로 고정해서 연도를 옮겨도 색이 비교 가능하도록 유지
+    min_scale = 0
+    values = region_year["Value"].to_numpy()
+    max_scale = float(np.quantile(values, 0.95)) if values.size else 1.0
+    if max_scale <= 0:
+        max_scale = 1.0
+
+    fig_globe = px.choropleth(
+        _iso_map.assign(Value=0.0),
+        locations="ISO",
+        color="Value",
+        hover_name="Region",
+        hover_data={"ISO": False, "Country": True, "Value": True},
+        color_continuous_scale=color_scale,
+        range_color=(min_scale, max_scale),
+        projection="orthographic",
+        template="plotly_dark",
+    )
 
-cols = st.columns(len(top_5_disasters))
-selected_types = []
+    fig_globe.update_geos(
+        showframe=False,
+        showcoastlines=True,
+        coastlinecolor="rgba(220,220,220,0.35)",
+        showocean=True,
+        oceancolor="rgb(30, 55, 90)",
+        showlakes=True,
+        lakecolor="rgb(30, 55, 90)",
+        bgcolor="rgb(12, 14, 20)",
+    )
 
-for col, t in zip(cols, top_5_disasters):
-    with col:
-        checked = st.checkbox(
-            t,
-            key=f"globe_type_{t}"
-        )
-        if checked:
-            selected_types.append(t)
+    fig_globe.update_layout(
+        height=700,
+        margin={"r":0, "t":60, "l":0, "b":0},
+        paper_bgcolor="rgb(10,10,15)",
+        plot_bgcolor="rgb(10,10,15)",
+        coloraxis_colorbar=dict(
+            title=dict(text=metric_choice, side="right"),
+            x=0.9,
+        ),
+        hovermode="closest",
+        uirevision=uirevision
+    )
 
-st.session_state["globe_types"] = selected_types
+    fig_globe.update_geos(
+        showland=True,
+        landcolor="rgba(240,240,240,0.15)"
+    )
 
-if len(selected_types) == 0:
-    st.warning("재해 유형을 최소 1개 이상 선택해주세요.")
-    st.stop()
+    return fig_globe
+
+# 연도별 Figure는 기본 Figure를 복사해 색 값/hover 값과 제목만 교체 (px.choropleth 재생성 생략)
+# plotly_chart는 Figure를 수정하지 않으므로 복사 없는 cache_resource 사용
+@st.cache_resource(show_spinner=False, max_entries=128)
+def build_globe_figure(_cube, _iso_map, selected_types, metric_choice, year, uirevision):
+    value_col, _ = GLOBE_METRICS[metric_choice]
+    region_year = build_region_year(_cube, tuple(sorted(selected_types)), value_col)
+
+    # 선택 연도의 대륙 값은 몇 개뿐이므로, merge 대신 {대륙: 값} dict를 ISO 행에 map
+    year_values = region_year[region_year["Start Year"] == year]
+    region_to_value = dict(zip(year_values["Region"], year_values["Value"]))
+    # Region이 category라 map 결과도 category가 될 수 있으므로 숫자형으로 맞춤 (연속 색상 유지)
+    values = _iso_map["Region"].map(region_to_value).astype("float64").fillna(0).to_numpy()
+
+    fig_globe = go.Figure(build_globe_base(_cube, _iso_map, selected_types, metric_choice, uirevision))
+    fig_globe.update_traces(
+        z=values,
+        customdata=np.column_stack((_iso_map["ISO"], _iso_map["Country"], values)),
+    )
+    fig_globe.update_layout(title_text=f"{year}년 전 세계 {metric_choice} — {', '.join(selected_types)}")
 
-df_globe = df_raw[df_raw["Disaster Type"].isin(selected_types)].copy()
+    return fig_globe
 
-if metric_choice == "발생 건수":
-    color_scale = "Oranges"
-    metric_mode = "count"
-    value_col = None
-elif metric_choice == "사망자 수":
-    color_scale = "Reds"
-    metric_mode = "sum"
-    value_col = "Total Deaths"
-else:
-    color_scale = "YlOrBr"
-    metric_mode = "sum"
-    value_col = "Total Affected"
+def reset_globe():
+    st.session_state["globe_reset"] = True
+    st.session_state["globe_view_rev"] += 1
 
-MAX_YEAR = df_globe["Start Year"].max() - 1
-df_globe = df_globe[df_globe["Start Year"] <= MAX_YEAR]
+# 지구본 위젯 조작 시 이 섹션만 다시 실행되도록 fragment로 분리
+@st.fragment
+def globe_section(cube, iso_map):
+    if st.session_state["globe_reset"]:
+        st.session_state["globe_types"] = list(top_5_disasters)
+        st.session_state["globe_metric"] = DEFAULT_METRIC
+        st.session_state["globe_year"] = GLOBE_MAX_YEAR
+        st.session_state["globe_reset"] = False
 
-if metric_mode == "count":
-    region_year = (
-        df_globe.groupby(["Start Year", "Region"])
-        .size()
-        .reset_index(name="Value")
-    )
-else:
-    region_year = (
-        df_globe.groupby(["Start Year", "Region"])[value_col]
-        .sum()
-        .reset_index(name="Value")
-    )
+    col_metric, col_reset = st.columns([8, 2])
+
+    with col_metric:
+        metric_choice = st.radio(
+            "시각화 지표 선택:",
+            ("발생 건수", "사망자 수", "피해 인구"),
+            horizontal=True,
+            key="globe_metric"
+        )
 
-df_iso_mapping = df_raw[["Region", "ISO", "Country"]].drop_duplicates()
+    with col_reset:
+        st.markdown("<div style='height:32px'></div>", unsafe_allow_html=True)
+        st.button("↩ 지구본 초기화", key="btn_reset_globe", on_click=reset_globe)
 
-map_data_all = (
-    df_iso_mapping.merge(region_year, on="Region", how="left")
-    .fillna({"Value": 0})
-)
+    # 유형별 체크박스 대신 multiselect 하나로 선택 (제목/캐시 키는 Top 5 순서로 정렬)
+    picked = st.multiselect("재해 유형 선택 (Top 5)", top_5_disasters, key="globe_types")
+    selected_types = [t for t in top_5_disasters if t in picked]
 
-min_scale = 0
-max_scale = float(region_year["Value"].quantile(0.95)) if len(region_year) else 1.0
-if max_scale <= 0:
-    max_scale = 1.0
-
-fig_globe = px.choropleth(
-    map_data_all,
-    locations="ISO",
-    color="Value",
-    hover_name="Region",
-    hover_data={"ISO": False, "Country": True, "Value": True, "Start Year": True},
-    color_continuous_scale=color_scale,
-    range_color=(min_scale, max_scale),
-    projection="orthographic",
-    animation_frame="Start Year",
-    template="plotly_dark",
-    title=f"전 세계 {metric_choice} — {', '.join(selected_types)}"
-)
+    if len(selected_types) == 0:
+        st.warning("재해 유형을 최소 1개 이상 선택해주세요.")
+        return
 
-fig_globe.update_geos(
-    showframe=False,
-    showcoastlines=True,
-    coastlinecolor="rgba(220,220,220,0.35)",
-    showocean=True,
-    oceancolor="rgb(30, 55, 90)",
-    showlakes=True,
-    lakecolor="rgb(30, 55, 90)",
-    bgcolor="rgb(12, 14, 20)",
-)
+    # 차트를 다시 마운트하지 않고 uirevision 값만 바꿔 회전/줌 상태를 초기화 (두 값을 번갈아 써서 캐시 항목은 2벌)
+    uirevision = f"globe_view_{st.session_state['globe_view_rev'] % 2}"
 
-uirevision = None if st.session_state.get("globe_reset", False) else "globe_anim"
+    # 전체 연도를 애니메이션 프레임으로 보내지 않고, 슬라이더로 고른 한 해만 그림
+    year = st.slider("연도 선택", GLOBE_MIN_YEAR, GLOBE_MAX_YEAR, key="globe_year")
 
-fig_globe.update_layout(
-    height=700,
-    margin={"r":0, "t":60, "l":0, "b":0},
-    paper_bgcolor="rgb(10,10,15)",
-    plot_bgcolor="rgb(10,10,15)",
-    coloraxis_colorbar=dict(
-        title=dict(text=metric_choice, side="right"),
-        x=0.9,
-    ),
-    uirevision=uirevision
-)
+    fig_globe = build_globe_figure(cube, iso_map, tuple(selected_types), metric_choice, year, uirevision)
 
-fig_globe.update_geos(
-    showland=True,
-    landcolor="rgba(240,240,240,0.15)"
-)
+    st.plotly_chart(
+        fig_globe,
+        use_container_width=True,
+        config={"scrollZoom": True},
+        key="globe_chart"
+    )
 
-if fig_globe.layout.sliders and len(fig_globe.layout.sliders) > 0:
-    fig_globe.layout.sliders[0].active = 0
-
-if fig_globe.layout.updatemenus and len(fig_globe.layout.updatemenus) > 0:
-    try:
-        fig_globe.layout.updatemenus[0].buttons[0].args[1]["frame"]["duration"] = 600
-        fig_globe.layout.updatemenus[0].buttons[0].args[1]["transition"]["duration"] = 200
-    except Exception:
-        pass
-
-st.plotly_chart(
-    fig_globe,
-    use_container_width=True,
-    config={"scrollZoom": True},
-    key=f"globe_{st.session_state['globe_render_key']}"
-)
+globe_section(df_cube, df_iso_mapping)
 
 # 섹션 1 인사이트
 st.info(
@@ -301,13 +437,8 @@ st.markdown("---")
 st.subheader("📊 섹션 2. 글로벌 Top 5 재해 발생 수 vs 사망자 수 추이")
 st.markdown("##### 재해는 늘지만, 사망자는 줄어들고 있다?")
 
-top5_global = (
-    df_raw["Disaster Type"]
-    .value_counts()
-    .nlargest(5)
-    .index
-    .tolist()
-)
+# 섹션 1 지구본의 전체 Top 5와 같은 목록이므로 재사용
+top5_global = top_5_disasters
 
 for t in top5_global:
     k = f"ins1_type_{t}"
@@ -341,36 +472,30 @@ if len(ins1_selected) == 0:
     st.warning("재해 유형을 최소 1개 이상 선택해주세요.")
     st.stop()
 
-@st.cache_data(show_spinner=False)
-def build_insight1_agg(df, selected_types):
-    dff = df[df["Disaster Type"].isin(selected_types)].copy()
+# 결과는 그래프 입력으로 읽기만 하므로 cache_resource로 공유 (cache hit 시 복사 없음)
+@st.cache_resource(show_spinner=False)
+def build_insight1_agg(_cube, year_lo, year_hi, selected_types):
+    # 큐브에서 대륙 축만 합쳐 (연도, 유형)별 발생 건수/사망자를 한 번에 집계
+    dff = year_slice(_cube, year_lo, year_hi)
+    dff = dff[type_mask(dff, selected_types)]
 
-    occ = (
-        dff.groupby(["Start Year", "Disaster Type"])
-        .size()
-        .reset_index(name="Occurrences")
-    )
-    deaths = (
-        dff.groupby(["Start Year", "Disaster Type"])["Total Deaths"]
+    out = (
+        dff.groupby(["Start Year", "Disaster Type"], observed=True, sort=False)[["Occurrences", "Deaths"]]
         .sum()
-        .reset_index(name="Deaths")
+        .reset_index()
     )
-
-    out = occ.merge(deaths, on=["Start Year", "Disaster Type"], how="outer").fillna(0)
     out["Start Year"] = out["Start Year"].astype(int)
     return out.sort_values(["Start Year", "Disaster Type"])
 
-df_ins1 = build_insight1_agg(df_raw, tuple(ins1_selected))
-
-MAX_YEAR_INS1 = df_raw["Start Year"].max() - 1
-df_ins1 = df_ins1[df_ins1["Start Year"] <= MAX_YEAR_INS1]
-df_ins1 = df_ins1[df_ins1["Start Year"] != 1970]
+# 1970년은 제외하고, 마지막 연도는 집계가 불완전하므로 제외
+MAX_YEAR_INS1 = LAST_FULL_YEAR
+df_ins1 = build_insight1_agg(df_cube, 1971, MAX_YEAR_INS1, tuple(sorted(ins1_selected)))
 
 fig_ins1 = make_subplots(specs=[[{"secondary_y": True}]])
 
 if st.session_state["ins1_total_mode"]:
     df_total = (
-        df_ins1.groupby("Start Year")[["Occurrences", "Deaths"]]
+        df_ins1.groupby("Start Year", sort=False)[["Occurrences", "Deaths"]]
         .sum()
         .reset_index()
         .sort_values("Start Year")
@@ -386,8 +511,9 @@ if st.session_state["ins1_total_mode"]:
         secondary_y=False
     )
 
+    # 사망자 선은 SVG 대신 WebGL(scattergl)로 그림 (스토리 막대 레이스 잔상과 동일)
     fig_ins1.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=df_total["Start Year"],
             y=df_total["Deaths"],
             name="전체 사망자 수",
@@ -401,8 +527,12 @@ if st.session_state["ins1_total_mode"]:
     fig_ins1.update_layout(barmode="overlay")
 
 else:
+    # 유형마다 두 번씩 마스크로 거르지 않고 groupby 한 번으로 유형별 행을 나눠 둠
+    by_type = dict(tuple(df_ins1.groupby("Disaster Type", observed=True, sort=False)))
+    empty = df_ins1.iloc[:0]
+
     for t in ins1_selected:
-        df_t = df_ins1[df_ins1["Disaster Type"] == t]
+        df_t = by_type.get(t, empty)
         fig_ins1.add_trace(
             go.Bar(
                 x=df_t["Start Year"],
@@ -414,10 +544,11 @@ else:
             secondary_y=False
         )
 
+    # 사망자 선도 WebGL(scattergl)로 그림
     for t in ins1_selected:
-        df_t = df_ins1[df_ins1["Disaster Type"] == t]
+        df_t = by_type.get(t, empty)
         fig_ins1.add_trace(
-            go.Scatter(
+            go.Scattergl(
                 x=df_t["Start Year"],
                 y=df_t["Deaths"],
                 name=f"{t} (사망자)",
@@ -464,96 +595,78 @@ st.markdown("---")
 st.subheader("🌐 섹션 3. 대륙별 Top 5 재해 발생 수 추이")
 st.markdown("##### 대륙마다 다른 재해의 얼굴")
 
-regions = ["Global"] + sorted(df_raw["Region"].dropna().unique().tolist())
-selected_region = st.radio("대륙 선택", regions, horizontal=True, index=0, key="region_section3")
+# 대륙/유형/연도 위젯 조작 시 이 섹션만 다시 실행되도록 fragment로 분리 (지구본과 동일)
+@st.fragment
+def occurrence_section(cube):
+    regions = region_list(df_raw)
+    selected_region = st.radio("대륙 선택", regions, horizontal=True, index=0, key="region_section3")
 
-if selected_region == "Global":
-    df_region = df_raw.copy()
-else:
-    df_region = df_raw[df_raw["Region"] == selected_region].copy()
-
-TOP_N = 5
-top_types = (
-    df_region["Disaster Type"]
-    .value_counts()
-    .nlargest(TOP_N)
-    .index
-    .tolist()
-)
+    TOP_N = 5
+    top_types = top_n_types(df_raw, selected_region, TOP_N)
 
-if len(top_types) == 0:
-    st.warning("해당 대륙에는 표시할 데이터가 없습니다.")
-    st.stop()
+    if len(top_types) == 0:
+        st.warning("해당 대륙에는 표시할 데이터가 없습니다.")
+        return
 
-st.caption("재해 유형 선택 (선택한 대륙의 Top 5)")
+    color_map = DISASTER_COLOR_MAP
 
-color_map = DISASTER_COLOR_MAP
+    selected_types = st.multiselect(
+        "재해 유형 선택 (선택한 대륙의 Top 5)",
+        top_types,
+        default=list(top_types),
+        key=f"types_{selected_region}"
+    )
 
-cols = st.columns(len(top_types))
-selected_types = []
+    if len(selected_types) == 0:
+        st.info("👆 최소 1개 이상의 재해 유형을 선택해야 그래프가 표시됩니다.")
+        return
 
-for col, t in zip(cols, top_types):
-    with col:
-        if st.checkbox(t, value=True, key=f"chk_{selected_region}_{t}"):
-            selected_types.append(t)
+    region_yearly = region_type_yearly(cube, selected_region)
+    df_occ = region_yearly.loc[type_mask(region_yearly, selected_types), ["Start Year", "Disaster Type", "Occurrences"]]
 
-if len(selected_types) == 0:
-    st.info("👆 최소 1개 이상의 재해 유형을 선택해야 그래프가 표시됩니다.")
-    st.stop()
+    ordered_selected = [t for t in top_types if t in selected_types]
 
-df_occ = (
-    df_region[df_region["Disaster Type"].isin(selected_types)]
-    .groupby(["Start Year", "Disaster Type"])
-    .size()
-    .reset_index(name="Occurrences")
-)
-
-ordered_selected = [t for t in top_types if t in selected_types]
-df_occ["Disaster Type"] = pd.Categorical(
-    df_occ["Disaster Type"],
-    categories=ordered_selected,
-    ordered=True
-)
-df_occ = df_occ.sort_values(["Start Year", "Disaster Type"])
+    # region_type_yearly가 연도순으로 정렬해 두므로 연도 필터는 searchsorted 슬라이스로 처리
+    min_y = int(df_occ["Start Year"].min())
+    max_y = int(df_occ["Start Year"].max())-1
+    year_range = st.slider("연도 범위", min_y, max_y, (min_y, max_y))
 
-min_y = int(df_occ["Start Year"].min())
-max_y = int(df_occ["Start Year"].max())-1
-year_range = st.slider("연도 범위", min_y, max_y, (min_y, max_y))
+    df_occ = year_slice(df_occ, year_range[0], year_range[1])
 
-df_occ = df_occ[(df_occ["Start Year"] >= year_range[0]) & (df_occ["Start Year"] <= year_range[1])]
+    fig_area = px.area(
+        df_occ,
+        x="Start Year",
+        y="Occurrences",
+        color="Disaster Type",
+        template="plotly_dark",
+        category_orders={"Disaster Type": ordered_selected},
+        color_discrete_map=color_map,
+        labels={"Start Year": "연도", "Occurrences": "발생 건수", "Disaster Type": "유형"},
+        title=f"{selected_region} — 시간에 따른 재해 발생 추이"
+    )
 
-fig_area = px.area(
-    df_occ,
-    x="Start Year",
-    y="Occurrences",
-    color="Disaster Type",
-    template="plotly_dark",
-    category_orders={"Disaster Type": ordered_selected},
-    color_discrete_map=color_map,
-    labels={"Start Year": "연도", "Occurrences": "발생 건수", "Disaster Type": "유형"},
-    title=f"{selected_region} — 시간에 따른 재해 발생 추이"
-)
+    fig_area.update_traces(opacity=0.7)
 
-fig_area.update_traces(opacity=0.7)
+    fig_area.update_layout(
+        height=520,
+        title=dict(
+            x=0.5,
+            xanchor="center",
+            pad=dict(b=25)
+        ),
+        legend=dict(
+            orientation="h",
+            y=1.18,
+            x=0.5,
+            xanchor="center",
+            traceorder="normal"
+        ),
+        margin=dict(l=20, r=20, t=150, b=20)
+    )
 
-fig_area.update_layout(
-    height=520,
-    title=dict(
-        x=0.5,
-        xanchor="center",
-        pad=dict(b=25)
-    ),
-    legend=dict(
-        orientation="h",
-        y=1.18,
-        x=0.5,
-        xanchor="center",
-        traceorder="normal"
-    ),
-    margin=dict(l=20, r=20, t=150, b=20)
-)
+    st.plotly_chart(fig_area, use_container_width=True)
 
-st.plotly_chart(fig_area, use_container_width=True)
+occurrence_section(df_cube)
 
 # 섹션 3 인사이트
 st.info(
@@ -566,115 +679,94 @@ st.markdown("---")
 st.subheader("☠️ 섹션 4. 대륙별 Top 5 재해 유형별 사망자 수 추이")
 st.markdown("##### '자주'가 아니라 '치명적인' 재해는 무엇인가?")
 
-regions = ["Global"] + sorted(df_raw["Region"].dropna().unique().tolist())
-selected_region = st.radio(
-    "대륙 선택 (사망자)",
-    regions,
-    horizontal=True,
-    index=0,
-    key="region_deaths"
-)
+@st.fragment
+def deaths_section(cube):
+    regions = region_list(df_raw)
+    selected_region = st.radio(
+        "대륙 선택 (사망자)",
+        regions,
+        horizontal=True,
+        index=0,
+        key="region_deaths"
+    )
 
-if selected_region == "Global":
-    df_region = df_raw.copy()
-else:
-    df_region = df_raw[df_raw["Region"] == selected_region].copy()
-
-TOP_N = 5
-top_types = (
-    df_region.groupby("Disaster Type")["Total Deaths"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(TOP_N)
-    .index
-    .tolist()
-)
+    TOP_N = 5
+    top_types = top_n_types_by_deaths(cube, selected_region, TOP_N)
 
-if len(top_types) == 0:
-    st.warning("해당 대륙에는 인명 피해 데이터가 없습니다.")
-    st.stop()
+    if len(top_types) == 0:
+        st.warning("해당 대륙에는 인명 피해 데이터가 없습니다.")
+        return
 
-st.caption("재해 유형 선택 (사망자 합계 기준 Top 5)")
+    color_map = DISASTER_COLOR_MAP
 
-color_map = DISASTER_COLOR_MAP
+    selected_types = st.multiselect(
+        "재해 유형 선택 (사망자 합계 기준 Top 5)",
+        top_types,
+        default=list(top_types),
+        key=f"types_deaths_{selected_region}"
+    )
 
-cols = st.columns(len(top_types))
-selected_types = []
+    if len(selected_types) == 0:
+        st.info("👆 최소 1개 이상의 재해 유형을 선택해야 그래프가 표시됩니다.")
+        return
 
-for col, t in zip(cols, top_types):
-    with col:
-        if st.checkbox(t, value=True, key=f"chk_deaths_{selected_region}_{t}"):
-            selected_types.append(t)
+    region_yearly = region_type_yearly(cube, selected_region)
+    df_deaths = (
+        region_yearly.loc[type_mask(region_yearly, selected_types), ["Start Year", "Disaster Type", "Deaths"]]
+        .rename(columns={"Deaths": "Total Deaths"})
+    )
 
-if len(selected_types) == 0:
-    st.info("👆 최소 1개 이상의 재해 유형을 선택해야 그래프가 표시됩니다.")
-    st.stop()
+    ordered_selected = [t for t in top_types if t in selected_types]
 
-df_deaths = (
-    df_region[df_region["Disaster Type"].isin(selected_types)]
-    .groupby(["Start Year", "Disaster Type"])["Total Deaths"]
-    .sum()
-    .reset_index()
-)
+    min_y = int(df_deaths["Start Year"].min())
+    max_y = int(df_deaths["Start Year"].max())
+    year_range = st.slider(
+        "연도 범위 (사망자)",
+        min_y,
+        max_y,
+        (min_y, max_y),
+        key="year_range_deaths"
+    )
 
-ordered_selected = [t for t in top_types if t in selected_types]
-df_deaths["Disaster Type"] = pd.Categorical(
-    df_deaths["Disaster Type"],
-    categories=ordered_selected,
-    ordered=True
-)
-df_deaths = df_deaths.sort_values(["Start Year", "Disaster Type"])
-
-min_y = int(df_deaths["Start Year"].min())
-max_y = int(df_deaths["Start Year"].max())
-year_range = st.slider(
-    "연도 범위 (사망자)",
-    min_y,
-    max_y,
-    (min_y, max_y),
-    key="year_range_deaths"
-)
+    df_deaths = year_slice(df_deaths, year_range[0], year_range[1])
 
-df_deaths = df_deaths[
-    (df_deaths["Start Year"] >= year_range[0]) &
-    (df_deaths["Start Year"] <= year_range[1])
-]
+    fig_deaths = px.area(
+        df_deaths,
+        x="Start Year",
+        y="Total Deaths",
+        color="Disaster Type",
+        template="plotly_dark",
+        category_orders={"Disaster Type": ordered_selected},
+        color_discrete_map=color_map,
+        labels={
+            "Start Year": "연도",
+            "Total Deaths": "사망자 수",
+            "Disaster Type": "유형"
+        },
+        title=f"{selected_region} — 시간에 따른 재해 사망자 추이"
+    )
 
-fig_deaths = px.area(
-    df_deaths,
-    x="Start Year",
-    y="Total Deaths",
-    color="Disaster Type",
-    template="plotly_dark",
-    category_orders={"Disaster Type": ordered_selected},
-    color_discrete_map=color_map,
-    labels={
-        "Start Year": "연도",
-        "Total Deaths": "사망자 수",
-        "Disaster Type": "유형"
-    },
-    title=f"{selected_region} — 시간에 따른 재해 사망자 추이"
-)
+    fig_deaths.update_traces(opacity=0.7)
 
-fig_deaths.update_traces(opacity=0.7)
+    fig_deaths.update_layout(
+        height=520,
+        title=dict(
+            x=0.5,
+            xanchor="center",
+            pad=dict(b=25)
+        ),
+        legend=dict(
+            orientation="h",
+            y=1.18,
+            x=0.5,
+            xanchor="center"
+        ),
+        margin=dict(l=20, r=20, t=150, b=20)
+    )
 
-fig_deaths.update_layout(
-    height=520,
-    title=dict(
-        x=0.5,
-        xanchor="center",
-        pad=dict(b=25)
-    ),
-    legend=dict(
-        orientation="h",
-        y=1.18,
-        x=0.5,
-        xanchor="center"
-    ),
-    margin=dict(l=20, r=20, t=150, b=20)
-)
+    st.plotly_chart(fig_deaths, use_container_width=True)
 
-st.plotly_chart(fig_deaths, use_container_width=True)
+deaths_section(df_cube)
 
 # 섹션 4 인사이트
 st.info(
@@ -718,37 +810,40 @@ with nav_r:
     st.button("↩ 스토리 초기화", on_click=reset_story)
 
 @st.cache_data(show_spinner=False)
-def story_agg_no_window(df: pd.DataFrame, region: str, year_end: int):
+def story_agg_no_window(_cube: pd.DataFrame, region: str, year_end: int):
     FIXED_START = 1970
 
-    dff = df.copy()
-    if region != "Global":
-        dff = dff[dff["Region"] == region]
-
-    dff = dff[(dff["Start Year"] >= FIXED_START) & (dff["Start Year"] <= year_end)]
+    # _cube는 공유 사전 집계 프레임이므로 해시하지 않고 (region, year_end)만 캐시 키로 사용
+    dff = year_slice(_cube, FIXED_START, year_end)
+    dff = dff[region_mask(dff, region)]
 
     summary = (
-        dff.groupby("Disaster Type")
+        dff.groupby("Disaster Type", observed=True, sort=False)
         .agg(
-            occ_total=("Disaster Type", "size"),
-            d_total=("Total Deaths", "sum"),
+            occ_total=("Occurrences", "sum"),
+            d_total=("Deaths", "sum"),
         )
         .reset_index()
         .sort_values(["occ_total", "d_total"], ascending=False)
     )
 
     yearly = (
-        dff.groupby(["Start Year", "Disaster Type"])
-        .agg(
-            Occurrences=("Disaster Type", "size"),
-            Deaths=("Total Deaths", "sum"),
-        )
+        dff.groupby(["Start Year", "Disaster Type"], observed=True, sort=False)[["Occurrences", "Deaths"]]
+        .sum()
         .reset_index()
         .sort_values(["Start Year", "Disaster Type"])
     )
 
     return summary, yearly
 
+@st.cache_data(show_spinner=False)
+def story_type_yearly(_cube: pd.DataFrame, region: str, choice: str, year_lo: int, year_hi: int):
+    # 대륙별 (연도, 유형) 집계에서 선택 유형의 연도별 발생 건수/사망자만 골라냄 (원본 groupby 없음)
+    # region_type_yearly가 연도순으로 정렬돼 있으므로 연도 범위는 year_slice로 자름
+    ry = year_slice(region_type_yearly(_cube, region), year_lo, year_hi)
+    keep = (ry["Disaster Type"] == choice).to_numpy()
+    return ry.loc[keep, ["Start Year", "Occurrences", "Deaths"]].reset_index(drop=True)
+
 if st.session_state["story_step"] == 0:
     st.info(
         "대륙별로 재해 발생/인명피해가 어떻게 달라졌는지를 탐색해보세요!\n\n"
@@ -759,7 +854,7 @@ if st.session_state["story_step"] == 0:
 if st.session_state["story_step"] == 1:
     st.markdown("### 먼저, 가장 궁금한 대륙을 선택해 주세요.")
 
-    regions = ["Global"] + sorted(df_raw["Region"].dropna().unique().tolist())
+    regions = region_list(df_raw)
     if "story_region" not in st.session_state:
         st.session_state["story_region"] = "Global"
 
@@ -776,7 +871,7 @@ if st.session_state["story_step"] == 2:
     st.caption("시작 연도는 1970년 고정이며, 마지막 연도만 선택합니다.")
 
     FIXED_START = 1970
-    data_max_minus1 = int(df_raw["Start Year"].max()) - 1
+    data_max_minus1 = LAST_FULL_YEAR
     max_year = min(2025, data_max_minus1)
 
     if "story_year_end" not in st.session_state:
@@ -814,7 +909,7 @@ def make_bar_race_with_trail(
     topN: int = 5,
     trail_years: int = 5,
 ):
-    d = df_yearly[["Start Year", "Disaster Type", y_col]].copy()
+    d = df_yearly[["Start Year", "Disaster Type", y_col]]
     d = d[d["Start Year"] <= year_end]
     d = d[d[y_col].fillna(0) > 0]
 
@@ -828,24 +923,51 @@ def make_bar_race_with_trail(
     x_cap = max(x_cap, 1.0)
     x_max = x_cap * 1.15
 
+    pivot = d.pivot_table(index="Start Year", columns="Disaster Type", values=y_col, aggfunc="sum", observed=True, sort=False).fillna(0)
+
+    # 연도마다 필터+정렬하지 않고 (연도 × 유형) 표에서 모든 연도의 Top N을 한 번에 계산
+    # 동률이면 유형 이름 순서를 유지하도록 열을 정렬한 뒤 stable 정렬 사용
+    pivot = pivot.sort_index(axis=1)
+    pivot_vals = pivot.to_numpy(dtype=float)
+    top_idx = np.argsort(-pivot_vals, axis=1, kind="stable")[:, :topN]
+    type_names = pivot.columns.to_numpy()
+    row_of_year = {y: i for i, y in enumerate(pivot.index)}
+
+    # 막대 라벨 문자열도 프레임마다 만들지 않고 Top N 값 표에서 한 번에 생성 (같은 값은 한 번만 포맷)
+    top_vals = np.take_along_axis(pivot_vals, top_idx, axis=1)
+    uniq_vals, uniq_inv = np.unique(top_vals, return_inverse=True)
+    uniq_text = np.array([f"{int(v):,}" for v in uniq_vals], dtype=object)
+    top_text = uniq_text[uniq_inv].reshape(top_vals.shape)
+    # 유형별 색도 열 순서대로 한 번만 찾아두고 Top N 인덱스로 가져옴
+    type_colors = np.array([DISASTER_COLOR_MAP.get(t, "#888") for t in type_names], dtype=object)
+
     def top_for_year(y: int):
-        g = d[d["Start Year"] == y].sort_values(y_col, ascending=False).head(topN)
-        order = g["Disaster Type"].tolist()
-        vals_raw = g[y_col].astype(float).tolist()
+        i = row_of_year[y]
+        row_vals = top_vals[i]
+        keep = row_vals > 0
+        order = type_names[top_idx[i]][keep].tolist()
+        vals_raw = row_vals[keep].tolist()
         vals_plot = [min(v, x_cap) for v in vals_raw]
-        return order, vals_plot, vals_raw
+        text = top_text[i][keep].tolist()
+        colors = type_colors[top_idx[i]][keep].tolist()
+        return order, vals_plot, vals_raw, text, colors, top_idx[i][keep]
 
-    pivot = d.pivot_table(index="Start Year", columns="Disaster Type", values=y_col, aggfunc="sum").fillna(0)
+    # 잔상 위치: 이전 연도 행에서 현재 Top N 유형 열의 값을 배열 인덱싱으로 가져옴 (.loc 스칼라 조회 대신)
+    def trail_x(prev_y: int, cols):
+        j = row_of_year.get(prev_y)
+        if j is None:
+            return [None] * len(cols)
+        return pivot_vals[j, cols].tolist()
 
     first_year = years[0]
-    order0, vals0_plot, vals0_raw = top_for_year(first_year)
+    order0, vals0_plot, vals0_raw, text0, colors0, cols0 = top_for_year(first_year)
 
     bar = go.Bar(
         x=vals0_plot,
         y=order0,
         orientation="h",
-        marker=dict(color=[DISASTER_COLOR_MAP.get(t, "#888") for t in order0]),
-        text=[f"{int(v):,}" for v in vals0_raw],
+        marker=dict(color=colors0),
+        text=text0,
         textposition="inside",
         insidetextanchor="end",
         cliponaxis=False,
@@ -854,18 +976,19 @@ def make_bar_race_with_trail(
         name="",
     )
 
+    # 잔상 점은 프레임마다 다시 그려지므로 SVG 대신 WebGL(scattergl)로 렌더링
     trail_traces = []
     for k in range(1, trail_years + 1):
         alpha = max(0.08, 0.35 * (1 - (k / (trail_years + 1))))
         trail_traces.append(
-            go.Scatter(
-                x=[pivot.loc[first_year - k, t] if (first_year - k) in pivot.index and t in pivot.columns else None for t in order0],
+            go.Scattergl(
+                x=trail_x(first_year - k, cols0),
                 y=order0,
                 mode="markers",
                 marker=dict(
                     size=8,
                     opacity=alpha,
-                    color=[DISASTER_COLOR_MAP.get(t, "#888") for t in order0],
+                    color=colors0,
                     symbol="circle",
                 ),
                 hoverinfo="skip",
@@ -873,31 +996,22 @@ def make_bar_race_with_trail(
             )
         )
 
+    # 애니메이션 프레임의 trace는 기존 trace에 병합되므로 연도마다 바뀌는 값만 담음
+    # (크기/투명도/모양/hover 등 고정 속성을 프레임마다 반복 전송하지 않음)
     frames = []
     for y in years:
-        order, vals_plot, vals_raw = top_for_year(y)
+        order, vals_plot, vals_raw, text, colors, cols = top_for_year(y)
         bar_y = order
         bar_x = vals_plot
 
-        trails = []
-        for k in range(1, trail_years + 1):
-            alpha = max(0.08, 0.35 * (1 - (k / (trail_years + 1))))
-            prev_y = y - k
-            trails.append(
-                go.Scatter(
-                    x=[pivot.loc[prev_y, t] if (prev_y in pivot.index and t in pivot.columns) else None for t in order],
-                    y=order,
-                    mode="markers",
-                    marker=dict(
-                        size=8,
-                        opacity=alpha,
-                        color=[DISASTER_COLOR_MAP.get(t, "#888") for t in order],
-                        symbol="circle",
-                    ),
-                    hoverinfo="skip",
-                    showlegend=False,
-                )
+        trails = [
+            go.Scattergl(
+                x=trail_x(y - k, cols),
+                y=order,
+                marker=dict(color=colors),
             )
+            for k in range(1, trail_years + 1)
+        ]
 
         frames.append(
             go.Frame(
@@ -906,13 +1020,10 @@ def make_bar_race_with_trail(
                     go.Bar(
                         x=bar_x,
                         y=bar_y,
-                        orientation="h",
-                        marker=dict(color=[DISASTER_COLOR_MAP.get(t, "#888") for t in bar_y]),
-                        text=[f"{int(v):,}" for v in vals_raw],
+                        marker=dict(color=colors),
+                        text=text,
                         textposition="outside",
-                        cliponaxis=False,
                         customdata=vals_raw,
-                        hovertemplate="%{y}<br>%{customdata:,}<extra></extra>",
                     ),
                     *trails
                 ],
@@ -994,6 +1105,19 @@ def make_bar_race_with_trail(
 
     return fig
 
+# 프레임 수십 개짜리 Figure라 생성 비용이 크므로 (대륙, 연도, 지표) 단위로 재사용
+# df_yearly는 story_agg_no_window(region, year_end)의 캐시 결과라 키에서 제외
+@st.cache_resource(show_spinner=False, max_entries=64)
+def build_bar_race(_df_yearly, region, year_end, y_col, topN=5, trail_years=5):
+    return make_bar_race_with_trail(
+        df_yearly=_df_yearly,
+        y_col=y_col,
+        region=region,
+        year_end=year_end,
+        topN=topN,
+        trail_years=trail_years,
+    )
+
 # 대륙별 인사이트 정의
 REGION_INSIGHTS = {
     "Global": """
@@ -1062,14 +1186,11 @@ REGION_INSIGHTS = {
 
 if st.session_state["story_step"] == 3:
     region = st.session_state.get("story_region", "Global")
-    year_end = st.session_state.get(
-        "story_year_end",
-        int(df_raw["Start Year"].max()) - 1
-    )
+    year_end = st.session_state.get("story_year_end", LAST_FULL_YEAR)
 
     focus = st.session_state.get("story_metric_mode", "발생 건수")
 
-    df_sum, df_yearly = story_agg_no_window(df_raw, region, year_end)
+    df_sum, df_yearly = story_agg_no_window(df_cube, region, year_end)
 
     if df_sum.empty:
         st.warning("선택한 조건에서 표시할 데이터가 없습니다.")
@@ -1098,14 +1219,7 @@ if st.session_state["story_step"] == 3:
     topN = 5
     y_col = "Occurrences" if focus == "발생 건수" else "Deaths"
 
-    fig_top_anim = make_bar_race_with_trail(
-        df_yearly=df_yearly,
-        y_col=y_col,
-        region=region,
-        year_end=year_end,
-        topN=5,
-        trail_years=6,
-    )
+    fig_top_anim = build_bar_race(df_yearly, region, year_end, y_col, topN=5, trail_years=6)
 
     if fig_top_anim is None:
         st.warning("선택한 조건에서 표시할 데이터가 없습니다.")
@@ -1125,105 +1239,90 @@ if st.session_state["story_step"] == 4:
 
     region = st.session_state.get("story_region", "Global")
 
-    cand = sorted(df_raw["Disaster Type"].dropna().unique().tolist())
+    cand = type_list(df_raw)
     choice = st.selectbox("재해 유형 선택", cand)
 
-    d = df_raw.copy()
-
-    if region != "Global":
-        d = d[d["Region"] == region]
-
-    d = (
-        d[d["Disaster Type"] == choice]
-        .groupby("Start Year")
-        .agg(
-            Occurrences=("Disaster Type", "size"),
-            Deaths=("Total Deaths", "sum")
-        )
-        .reset_index()
-        .sort_values("Start Year")
-    )
-
     MINY = 1970
-    MAXY = int(df_raw["Start Year"].max()) - 1
-    d = d[(d["Start Year"] >= MINY) & (d["Start Year"] <= MAXY)]
+    MAXY = LAST_FULL_YEAR
+    d = story_type_yearly(df_cube, region, choice, MINY, MAXY)
 
     def make_anim(d):
         years = d["Start Year"].tolist()
-        fig = go.Figure()
-
-        d0 = d[d["Start Year"] <= years[0]]
+        color = DISASTER_COLOR_MAP.get(choice, "#1f77b4")
 
-        fig.add_bar(
-            x=d0["Start Year"],
-            y=d0["Occurrences"],
-            name="발생 건수",
-            marker=dict(color=DISASTER_COLOR_MAP.get(choice, "#1f77b4")),
-            opacity=0.70,
-            yaxis="y"
-        )
-
-        fig.add_scatter(
-            x=d0["Start Year"],
-            y=d0["Deaths"],
-            name="사망자 수",
-            mode="lines+markers",
-            line=dict(color=DISASTER_COLOR_MAP.get(choice, "#1f77b4"), width=3),
-            yaxis="y2"
-        )
+        # d는 연도순이므로 "y년까지" 구간은 배열 앞부분 슬라이스 (프레임마다 마스크 필터링 생략)
+        years_arr = d["Start Year"].to_numpy()
+        occ_arr = d["Occurrences"].to_numpy()
+        deaths_arr = d["Deaths"].to_numpy()
 
-        frames = []
-        for y in years:
-            dy = d[d["Start Year"] <= y]
-            frames.append(
-                go.Frame(
-                    name=str(y),
-                    data=[
-                        go.Bar(x=dy["Start Year"], y=dy["Occurrences"], opacity=0.70),
-                        go.Scatter(x=dy["Start Year"], y=dy["Deaths"])
-                    ]
-                )
+        # add_bar/frames/update_layout를 차례로 적용하면 매번 검증이 돌므로 전체를 dict 하나로 만들어 한 번에 생성
+        frames = [
+            dict(
+                name=str(y),
+                data=[
+                    dict(type="bar", x=years_arr[:i], y=occ_arr[:i], opacity=0.70),
+                    dict(type="scattergl", x=years_arr[:i], y=deaths_arr[:i]),
+                ],
             )
+            for i, y in enumerate(years, start=1)
+        ]
 
-        fig.frames = frames
-
-        steps = []
-        for y in years:
-            steps.append(
-                dict(
-                    method="animate",
-                    args=[[str(y)],
-                          dict(frame=dict(duration=80, redraw=True),
-                               transition=dict(duration=40))],
-                    label=str(y)
-                )
+        steps = [
+            dict(
+                method="animate",
+                args=[[str(y)],
+                      dict(frame=dict(duration=80, redraw=True),
+                           transition=dict(duration=40))],
+                label=str(y)
             )
+            for y in years
+        ]
 
-        fig.update_layout(
-            template="plotly_dark",
-            height=520,
-            title=f"{region} — {choice}",
-            sliders=[dict(active=0, steps=steps)],
-            updatemenus=[
+        return go.Figure(dict(
+            data=[
                 dict(
-                    type="buttons",
-                    buttons=[
-                        dict(
-                            label="▶ 재생",
-                            method="animate",
-                            args=[None, dict(frame=dict(duration=80, redraw=True))]
-                        )
-                    ]
-                )
+                    type="bar",
+                    x=years_arr[:1],
+                    y=occ_arr[:1],
+                    name="발생 건수",
+                    marker=dict(color=color),
+                    opacity=0.70,
+                    yaxis="y"
+                ),
+                dict(
+                    type="scattergl",
+                    x=years_arr[:1],
+                    y=deaths_arr[:1],
+                    name="사망자 수",
+                    mode="lines+markers",
+                    line=dict(color=color, width=3),
+                    yaxis="y2"
+                ),
             ],
-            yaxis=dict(title="발생 건수"),
-            yaxis2=dict(title="사망자 수", overlaying="y", side="right"),
-            autosize=False,
-            margin=dict(l=220, r=40, t=90, b=60),
-        )
-        fig.update_yaxes(automargin=False)
-
-        return fig
+            frames=frames,
+            layout=dict(
+                template="plotly_dark",
+                height=520,
+                title=f"{region} — {choice}",
+                sliders=[dict(active=0, steps=steps)],
+                updatemenus=[
+                    dict(
+                        type="buttons",
+                        buttons=[
+                            dict(
+                                label="▶ 재생",
+                                method="animate",
+                                args=[None, dict(frame=dict(duration=80, redraw=True))]
+                            )
+                        ]
+                    )
+                ],
+                yaxis=dict(title="발생 건수", automargin=False),
+                yaxis2=dict(title="사망자 수", overlaying="y", side="right", automargin=False),
+                autosize=False,
+                margin=dict(l=220, r=40, t=90, b=60),
+            ),
+        ))
 
     fig_anim = make_anim(d)
     st.plotly_chart(fig_anim, use_container_width=True)
@@ -1251,69 +1350,76 @@ st.markdown(
 START_Y = 1970
 
 def normalize_korea_df(df_korea_raw: pd.DataFrame) -> pd.DataFrame:
-    dfk = df_korea_raw.copy()
-
-    if "Year" in dfk.columns:
+    if "Year" in df_korea_raw.columns:
         year_col = "Year"
-    elif "Start Year" in dfk.columns:
+    elif "Start Year" in df_korea_raw.columns:
         year_col = "Start Year"
     else:
-        raise ValueError(f"[KOREA] Year 컬럼을 찾을 수 없어요. 현재 컬럼: {list(dfk.columns)}")
+        raise ValueError(f"[KOREA] Year 컬럼을 찾을 수 없어요. 현재 컬럼: {list(df_korea_raw.columns)}")
 
-    if "Total_Deaths" in dfk.columns:
+    if "Total_Deaths" in df_korea_raw.columns:
         deaths_col = "Total_Deaths"
-    elif "Total Deaths" in dfk.columns:
+    elif "Total Deaths" in df_korea_raw.columns:
         deaths_col = "Total Deaths"
     else:
-        raise ValueError(f"[KOREA] Deaths 컬럼을 찾을 수 없어요. 현재 컬럼: {list(dfk.columns)}")
+        raise ValueError(f"[KOREA] Deaths 컬럼을 찾을 수 없어요. 현재 컬럼: {list(df_korea_raw.columns)}")
 
-    if "Disaster Type" in dfk.columns:
+    if "Disaster Type" in df_korea_raw.columns:
         type_col = "Disaster Type"
     else:
-        raise ValueError(f"[KOREA] 'Disaster Type' 컬럼이 없어요. 현재 컬럼: {list(dfk.columns)}")
-
-    dfk = dfk.rename(columns={year_col: "Year", deaths_col: "Total_Deaths", type_col: "Disaster Type"})
+        raise ValueError(f"[KOREA] 'Disaster Type' 컬럼이 없어요. 현재 컬럼: {list(df_korea_raw.columns)}")
 
-    dfk["Year"] = pd.to_numeric(dfk["Year"], errors="coerce").astype("Int64")
-    dfk["Total_Deaths"] = pd.to_numeric(dfk["Total_Deaths"], errors="coerce").fillna(0)
-    dfk["Disaster Type"] = dfk["Disaster Type"].astype(str)
+    # 원본을 복사/rename하지 않고 필요한 세 컬럼만 배열로 변환한 뒤, 연도가 유효한 행으로 새 프레임을 한 번에 구성
+    years = pd.to_numeric(df_korea_raw[year_col], errors="coerce").to_numpy(dtype="float64")
+    deaths = pd.to_numeric(df_korea_raw[deaths_col], errors="coerce").fillna(0).to_numpy()
+    types = df_korea_raw[type_col].astype(str).to_numpy()
+    valid = np.isfinite(years)
 
-    dfk = dfk.dropna(subset=["Year"])
-    dfk["Year"] = dfk["Year"].astype(int)
+    dfk = pd.DataFrame({
+        "Year": years[valid].astype(int),
+        "Disaster Type": types[valid],
+        "Total_Deaths": deaths[valid],
+    })
 
-    dfk = dfk.groupby(["Year", "Disaster Type"], as_index=False)["Total_Deaths"].sum()
-
-    return dfk
+    return dfk.groupby(["Year", "Disaster Type"], observed=True, sort=False, as_index=False)["Total_Deaths"].sum()
 
 def make_korea_panel(dfk_norm: pd.DataFrame, start_year: int = 1970, top_n: int = 5):
-    dfk = dfk_norm[dfk_norm["Year"] >= start_year].copy()
+    dfk = dfk_norm[dfk_norm["Year"] >= start_year]
     if dfk.empty:
         return [], dfk
 
     end_year = int(dfk["Year"].max())
 
     top_types = (
-        dfk.groupby("Disaster Type")["Total_Deaths"]
+        dfk.groupby("Disaster Type", observed=True, sort=False)["Total_Deaths"]
         .sum()
         .nlargest(top_n)
         .index
         .tolist()
     )
 
-    years = pd.DataFrame({"Year": list(range(start_year, end_year + 1))})
-    base = years.merge(pd.DataFrame({"Disaster Type": top_types}), how="cross")
-
+    # (연도 × Top 유형) 전체 격자를 MultiIndex로 만들고 없는 조합은 0으로 채움 (연도, 유형 이름순)
+    grid = pd.MultiIndex.from_product(
+        [range(start_year, end_year + 1), sorted(top_types)],
+        names=["Year", "Disaster Type"],
+    )
     panel = (
-        base.merge(dfk[dfk["Disaster Type"].isin(top_types)], on=["Year", "Disaster Type"], how="left")
-            .fillna({"Total_Deaths": 0})
-            .sort_values(["Year", "Disaster Type"])
+        dfk[dfk["Disaster Type"].isin(top_types)]
+        .set_index(["Year", "Disaster Type"])["Total_Deaths"]
+        .reindex(grid, fill_value=0)
+        .reset_index()
     )
 
     return top_types, panel
 
+@st.cache_data(show_spinner=False)
+def build_korea_panel(_df_korea_raw):
+    # 한국 원본은 load_data()의 고정 결과이므로 해시 없이 한 번만 정규화/패널 생성
+    dfk_norm = normalize_korea_df(_df_korea_raw)
+    return make_korea_panel(dfk_norm, start_year=START_Y, top_n=5)
+
 try:
-    dfk_norm = normalize_korea_df(df_korea_raw)
-    top_5_kor, df_kor_filtered = make_korea_panel(dfk_norm, start_year=START_Y, top_n=5)
+    top_5_kor, df_kor_filtered = build_korea_panel(df_korea_raw)
 except Exception as e:
     st.error(f"한국 데이터 처리 중 오류: {e}")
     st.stop()
@@ -1322,26 +1428,39 @@ if len(top_5_kor) == 0 or df_kor_filtered.empty:
     st.warning("한국 데이터가 비어있어서 표시할 수 없습니다.")
     st.stop()
 
+# 패널은 연도순이므로 마지막 행이 최신 연도 (슬라이더 범위용, 한 번만 계산)
+KOREA_MAX_YEAR = int(df_kor_filtered["Year"].iloc[-1])
+
 st.subheader("📈 연도별 재해 발생 수 추이")
 st.markdown("##### 재난의 종류가 바뀌고 있다?!")
 
-fig_bar = px.bar(
-    df_kor_filtered,
-    x="Year",
-    y="Total_Deaths",
-    color="Disaster Type",
-    template="plotly_dark",
-    category_orders={"Disaster Type": top_5_kor},
-    color_discrete_map=DISASTER_COLOR_MAP,
-    opacity=0.7
-)
-fig_bar.update_layout(
-    xaxis_title="연도",
-    yaxis_title="사망자 수",
-    legend=dict(orientation="h", y=1.1, x=0.5, xanchor="center"),
-    height=420,
-    bargap=0.2
-)
+# 입력이 고정된 차트이므로 Figure 객체를 그대로 재사용 (plotly_chart는 Figure를 수정하지 않음)
+@st.cache_resource(show_spinner=False)
+def build_korea_bar(_df_panel, top_types):
+    # 패널은 (연도, 유형) 조합이 0으로 채워져 있으므로, 높이 0인 막대는 빼고 전달
+    bar_df = _df_panel[_df_panel["Total_Deaths"] > 0]
+
+    fig = px.bar(
+        bar_df,
+        x="Year",
+        y="Total_Deaths",
+        color="Disaster Type",
+        template="plotly_dark",
+        category_orders={"Disaster Type": list(top_types)},
+        color_discrete_map=DISASTER_COLOR_MAP,
+        range_x=[START_Y - 0.5, int(_df_panel["Year"].max()) + 0.5],
+        opacity=0.7
+    )
+    fig.update_layout(
+        xaxis_title="연도",
+        yaxis_title="사망자 수",
+        legend=dict(orientation="h", y=1.1, x=0.5, xanchor="center"),
+        height=420,
+        bargap=0.2
+    )
+    return fig
+
+fig_bar = build_korea_bar(df_kor_filtered, tuple(top_5_kor))
 st.plotly_chart(fig_bar, use_container_width=True)
 
 # 한국 섹션 1 인사이트
@@ -1356,124 +1475,122 @@ st.markdown("<br><br>", unsafe_allow_html=True)
 st.subheader("🧍 연도별 재해 사망자 추이 및 규모")
 st.markdown("##### 대규모 인명 피해는 감소했지만, 위험은 사라지지 않았다!")
 
-col_ctrl1, col_ctrl2 = st.columns([2.2, 1])
-
-with col_ctrl1:
-    max_year_kor = int(df_kor_filtered["Year"].max())
-    kor_year = st.slider(
-        "연도 선택",
-        START_Y,
-        max_year_kor,
-        min(2003, max_year_kor)
-    )
-
-with col_ctrl2:
-    default_type = "Fire (Miscellaneous)"
-    default_index = top_5_kor.index(default_type) if default_type in top_5_kor else 0
-
-    kor_type = st.selectbox(
-        "재해 유형 선택",
-        top_5_kor,
-        index=default_index,
-        key="kor_type_pic"
-    )
+@st.cache_data(show_spinner=False)
+def deaths_lookup(_df_panel):
+    # 패널은 매 실행 동일한 원본에서 만들어지므로 해시 없이 캐시 — {(연도, 유형): 사망자 수}
+    return _df_panel.groupby(["Year", "Disaster Type"], observed=True, sort=False)["Total_Deaths"].sum().to_dict()
+
+# 픽토그램 위젯/애니메이션은 fragment 안에서만 다시 실행
+@st.fragment
+def korea_pictogram(df_panel, top_types, max_year_kor):
+    col_ctrl1, col_ctrl2 = st.columns([2.2, 1])
+
+    with col_ctrl1:
+        kor_year = st.slider(
+            "연도 선택",
+            START_Y,
+            max_year_kor,
+            min(2003, max_year_kor)
+        )
 
-subset = df_kor_filtered[
-    (df_kor_filtered["Year"] == kor_year) &
-    (df_kor_filtered["Disaster Type"] == kor_type)
-]
-death_count = int(subset["Total_Deaths"].sum()) if not subset.empty else 0
+    with col_ctrl2:
+        default_type = "Fire (Miscellaneous)"
+        default_index = top_types.index(default_type) if default_type in top_types else 0
 
-current_context = f"{kor_year}_{kor_type}"
+        kor_type = st.selectbox(
+            "재해 유형 선택",
+            top_types,
+            index=default_index,
+            key="kor_type_pic"
+        )
 
-if "pictogram_context" not in st.session_state:
-    st.session_state.pictogram_context = current_context
+    death_count = int(deaths_lookup(df_panel).get((kor_year, kor_type), 0))
 
-if st.session_state.pictogram_context != current_context:
-    st.session_state.pictogram_context = current_context
-    st.session_state.pictogram_step = 0
-    st.session_state.pictogram_active = False
+    current_context = f"{kor_year}_{kor_type}"
 
-if "pictogram_step" not in st.session_state:
-    st.session_state.pictogram_step = 0
+    if "pictogram_context" not in st.session_state:
+        st.session_state.pictogram_context = current_context
 
-if "pictogram_active" not in st.session_state:
-    st.session_state.pictogram_active = False
+    if st.session_state.pictogram_context != current_context:
+        st.session_state.pictogram_context = current_context
+        st.session_state.pictogram_active = False
 
-col_pic_left, col_pic_right = st.columns([1, 3])
+    if "pictogram_active" not in st.session_state:
+        st.session_state.pictogram_active = False
 
-with col_pic_left:
-    st.markdown("<div style='text-align:center; margin-top:40px;'>", unsafe_allow_html=True)
-    st.markdown(f"<h2>{death_count:,} 명 사망</h2>", unsafe_allow_html=True)
+    if "pictogram_plays" not in st.session_state:
+        st.session_state.pictogram_plays = 0
 
-    speed = st.slider(
-        "애니메이션 속도",
-        0.005,
-        0.05,
-        0.015,
-        step=0.005,
-        key="pic_speed"
-    )
+    col_pic_left, col_pic_right = st.columns([1, 3])
 
-    cA, cB = st.columns(2)
-    with cA:
-        play = st.button("▶ 재생", key="pic_play")
-    with cB:
-        reset = st.button("↩ 초기화", key="pic_reset")
+    with col_pic_left:
+        st.markdown("<div style='text-align:center; margin-top:40px;'>", unsafe_allow_html=True)
+        st.markdown(f"<h2>{death_count:,} 명 사망</h2>", unsafe_allow_html=True)
 
-    st.markdown("</div>", unsafe_allow_html=True)
-    st.info("1 블록 = 1명")
+        speed = st.slider(
+            "애니메이션 속도",
+            0.005,
+            0.05,
+            0.015,
+            step=0.005,
+            key="pic_speed"
+        )
 
-with col_pic_right:
-    UNIT_PER_ICON = 1
-    base_icons = 430
-    active_icons = math.ceil(death_count / UNIT_PER_ICON)
+        cA, cB = st.columns(2)
+        with cA:
+            play = st.button("▶ 재생", key="pic_play")
+        with cB:
+            reset = st.button("↩ 초기화", key="pic_reset")
+
+        st.markdown("</div>", unsafe_allow_html=True)
+        # 사망자가 많아도 칸 수(그리드 높이/애니메이션 길이)가 MAX_ICONS를 넘지 않도록 1칸이 여러 명을 나타냄
+        MAX_ICONS = 500
+        UNIT_PER_ICON = max(1, math.ceil(death_count / MAX_ICONS))
+        st.info(f"1 블록 = {UNIT_PER_ICON}명")
+
+    with col_pic_right:
+        base_icons = 430
+        active_icons = math.ceil(death_count / UNIT_PER_ICON)
+
+        total_icons = max(base_icons, active_icons)
+
+        if death_count == 0:
+            active_class = ""
+        elif death_count > 100:
+            active_class = "active-red"
+        elif death_count > 50:
+            active_class = "active-orange"
+        else:
+            active_class = "active-yellow"
 
-    total_icons = max(base_icons, active_icons)
+        # 칸 수와 무관하게 요소 하나로 그림 — 채울 칸 수만 CSS 변수로 넘김 (style.css의 .person-cells)
+        GRID_COLS = 43
+        grid_rows = math.ceil(total_icons / GRID_COLS)
+        last_row = total_icons - (grid_rows - 1) * GRID_COLS
 
-    if death_count == 0:
-        active_class = ""
-    elif death_count > 100:
-        active_class = "active-red"
-    elif death_count > 50:
-        active_class = "active-orange"
-    else:
-        active_class = "active-yellow"
+        if reset:
+            st.session_state.pictogram_active = False
 
-    holder = st.empty()
+        # 재생은 브라우저의 CSS 애니메이션(--step 0 → 목표)으로 처리하므로 서버 루프/sleep 없음
+        # 애니메이션 이름을 번갈아 바꿔야 같은 요소에서도 재생이 다시 시작됨
+        anim_class = ""
+        if play:
+            st.session_state.pictogram_active = True
+            st.session_state.pictogram_plays += 1
+            anim_class = f"play-{st.session_state.pictogram_plays % 2}"
 
-    def render(step: int):
-        step = max(0, min(step, active_icons))
-        icon_html = ""
-        for i in range(total_icons):
-            cls = active_class if i < step else ""
-            icon_html += f'<div class="person-icon {cls}"></div>'
+        step = active_icons if st.session_state.pictogram_active else 0
 
-        holder.markdown(
+        st.markdown(
             f"""
             <div class="person-grid">
-                {icon_html}
+                <div class="person-cells {active_class} {anim_class}" style="--cols:{GRID_COLS}; --rows:{grid_rows}; --last:{last_row}; --step:{step}; --dur:{active_icons * speed:.3f}s;"></div>
             </div>
             """,
             unsafe_allow_html=True
         )
 
-    render(st.session_state.pictogram_step)
-
-    if reset:
-        st.session_state.pictogram_step = 0
-        st.session_state.pictogram_active = False
-        render(0)
-        st.stop()
-
-    if play:
-        st.session_state.pictogram_active = True
-        st.session_state.pictogram_step = 0
-
-        for step in range(0, active_icons + 1):
-            st.session_state.pictogram_step = step
-            render(step)
-            time.sleep(speed)
+korea_pictogram(df_kor_filtered, top_5_kor, KOREA_MAX_YEAR)
 
 # 한국 섹션 2 인사이트
 st.info(